@@ -0,0 +1,55 @@
+// On-save diagnostics for MirageScript, backed by `mirage check`.
+const { execFile } = require("child_process");
+const vscode = require("vscode");
+
+function activate(context) {
+  const collection = vscode.languages.createDiagnosticCollection("mirage");
+  context.subscriptions.push(collection);
+
+  const validate = (document) => {
+    if (document.languageId !== "mirage" || document.uri.scheme !== "file") {
+      return;
+    }
+    const config = vscode.workspace.getConfiguration("mirage");
+    const command = config.get("checkCommand", "mirage");
+    const args = ["check", "--static", "--format", "json", document.fileName];
+    execFile(command, args, { cwd: vscode.workspace.rootPath }, (error, stdout) => {
+      let results;
+      try {
+        results = JSON.parse(stdout);
+      } catch (parseError) {
+        // `mirage` is missing or crashed; leave the previous diagnostics in place.
+        if (error) {
+          console.warn(`mirage check failed: ${error.message}`);
+        }
+        return;
+      }
+      const diagnostics = results.map((item) => {
+        const line = Math.max(0, Math.min(item.line - 1, document.lineCount - 1));
+        const severity =
+          item.severity === "error"
+            ? vscode.DiagnosticSeverity.Error
+            : vscode.DiagnosticSeverity.Warning;
+        const diagnostic = new vscode.Diagnostic(
+          document.lineAt(line).range,
+          item.message,
+          severity
+        );
+        diagnostic.source = "mirage check";
+        return diagnostic;
+      });
+      collection.set(document.uri, diagnostics);
+    });
+  };
+
+  context.subscriptions.push(
+    vscode.workspace.onDidSaveTextDocument(validate),
+    vscode.workspace.onDidOpenTextDocument(validate),
+    vscode.workspace.onDidCloseTextDocument((document) => collection.delete(document.uri))
+  );
+  vscode.workspace.textDocuments.forEach(validate);
+}
+
+function deactivate() {}
+
+module.exports = { activate, deactivate };
@@ -0,0 +1,434 @@
+"""Lightweight static view of a MirageScript program.
+
+The model still interprets every script; this module only recovers enough
+structure (inputs, helpers, and the ``begin`` statements) for Python to make
+decisions before the conversation starts.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Mapping, Set
+
+_STORY_RE = re.compile(r'^story\s+"(?P<title>[^"]*)"')
+_INPUT_RE = re.compile(r"^(?P<kind>argument|file)\s+(?P<name>\w+)(?:\s+as\s+(?P<type>\S+))?")
+_HELPER_RE = re.compile(r"^helper\s+(?P<name>\w+)(?:\s+returns\s+(?P<returns>[^:]+))?:")
+_NEEDS_RE = re.compile(r"^needs\s+(?P<name>\w+)")
+_BINDING_RE = re.compile(
+    r"^(?P<parameter>\w+)\s+is\s+(?P<kind>memory|argument|file|item)\s+(?P<name>\w+)"
+)
+_REMEMBER_RE = re.compile(r"^remember\s+(?P<label>\w+)")
+_ASK_RE = re.compile(r"^ask\s+(?P<helper>\w+)")
+_FOR_EACH_RE = re.compile(
+    r"^for\s+each\s+(?P<item>\w+)\s+in\s+(?P<kind>memory|argument|file)\s+(?P<name>\w+)"
+    r"\s+ask\s+(?P<helper>\w+)"
+)
+_KEEP_RE = re.compile(r"^keep\s+answer\s+as\s+(?P<label>\w+)")
+_SHOW_RE = re.compile(r"^show\s+(?:memory\s+)?(?P<label>\w+)")
+_PLACEHOLDER_RE = re.compile(r"\{(?P<name>\w+)\}")
+
+TOOL_NAMES = (
+    "emit_output",
+    "list_inputs",
+    "get_input",
+    "read_source",
+    "read_file",
+    "save_file",
+    "map_helper",
+    "raise_error",
+)
+# Tools every run keeps: output is the whole point, read_source is the model's
+# fallback when it loses track of the program text, and raise_error is the only
+# sanctioned way to abort on missing or malformed data.
+_ALWAYS_TOOLS = ("emit_output", "read_source", "raise_error")
+_INPUT_TOOLS = ("list_inputs", "get_input")
+
+
+@dataclass
+class InputDecl:
+    kind: str
+    name: str
+    type_name: str | None
+    line: int
+
+
+@dataclass
+class HelperDecl:
+    name: str
+    returns: str | None
+    line: int
+    needs: List[str] = field(default_factory=list)
+    prompt: str = ""
+
+
+@dataclass
+class Binding:
+    parameter: str
+    kind: str
+    name: str
+    line: int
+
+
+@dataclass
+class Statement:
+    keyword: str
+    line: int
+    text: str
+    target: str | None = None
+    bindings: List[Binding] = field(default_factory=list)
+    # For ``for each`` statements: the loop variable (as ``parameter``) and the
+    # list it iterates over.
+    collection: Binding | None = None
+
+    def input_bindings(self) -> List[Binding]:
+        """Every binding that reads data, including the list a ``for each`` walks."""
+        if self.collection is None:
+            return list(self.bindings)
+        return [self.collection, *self.bindings]
+
+    def item_parameter(self, helper: HelperDecl | None) -> str | None:
+        """Return the helper parameter that receives each element of a ``for each``."""
+        for binding in self.bindings:
+            if binding.kind == "item":
+                return binding.parameter
+        if helper is None:
+            return None
+        bound = {binding.parameter for binding in self.bindings}
+        return next((name for name in helper.needs if name not in bound), None)
+
+
+@dataclass
+class Diagnostic:
+    line: int
+    severity: str
+    message: str
+
+    def format(self, path: Path | str) -> str:
+        return f"{path}:{self.line}: {self.severity}: {self.message}"
+
+
+@dataclass
+class MirageScript:
+    title: str | None = None
+    inputs: List[InputDecl] = field(default_factory=list)
+    helpers: Dict[str, HelperDecl] = field(default_factory=dict)
+    statements: List[Statement] = field(default_factory=list)
+    source: str = ""
+    has_begin: bool = False
+
+    def statement_keywords(self) -> Set[str]:
+        return {statement.keyword for statement in self.statements}
+
+    def mentions(self, word: str) -> bool:
+        return re.search(rf"\b{re.escape(word)}\b", self.source) is not None
+
+
+def parse_script(source: str) -> MirageScript:
+    """Recover the declarations and ``begin`` statements of a Mirage program.
+
+    Parsing is deliberately forgiving: lines that do not match a known shape are
+    ignored so the model remains the final authority on what a script means.
+    """
+    script = MirageScript(source=source)
+    section: str | None = None
+    seen_begin = False
+    helper: HelperDecl | None = None
+    prompt_lines: List[str] | None = None
+
+    for number, raw in enumerate(source.splitlines(), start=1):
+        stripped = raw.strip()
+
+        if prompt_lines is not None:
+            if stripped == ">>>":
+                if helper is not None:
+                    helper.prompt = "\n".join(prompt_lines)
+                prompt_lines = None
+            else:
+                prompt_lines.append(raw)
+            continue
+        if stripped == "<<<":
+            prompt_lines = []
+            continue
+        if not stripped or stripped.startswith("#"):
+            continue
+
+        if not raw[0].isspace():
+            helper = None
+            story = _STORY_RE.match(stripped)
+            helper_match = _HELPER_RE.match(stripped)
+            if story:
+                script.title = story.group("title")
+                section = "story"
+            elif helper_match:
+                helper = HelperDecl(
+                    name=helper_match.group("name"),
+                    returns=(helper_match.group("returns") or "").strip() or None,
+                    line=number,
+                )
+                script.helpers.setdefault(helper.name, helper)
+                section = "helper"
+            elif stripped == "inputs:":
+                section = "inputs"
+            elif stripped == "begin:":
+                section = "begin"
+                seen_begin = True
+            elif stripped.startswith("object "):
+                section = "object"
+            else:
+                section = None
+            continue
+
+        if section == "inputs":
+            match = _INPUT_RE.match(stripped)
+            if match:
+                script.inputs.append(
+                    InputDecl(
+                        kind=match.group("kind"),
+                        name=match.group("name"),
+                        type_name=match.group("type"),
+                        line=number,
+                    )
+                )
+        elif section == "helper" and helper is not None:
+            match = _NEEDS_RE.match(stripped)
+            if match:
+                helper.needs.append(match.group("name"))
+        elif section == "begin":
+            _parse_begin_line(script, stripped, number)
+
+    script.has_begin = seen_begin
+    return script
+
+
+def _parse_begin_line(script: MirageScript, stripped: str, number: int) -> None:
+    binding = _BINDING_RE.match(stripped)
+    previous = script.statements[-1] if script.statements else None
+    if binding and previous is not None and previous.keyword in {"ask", "for"}:
+        previous.bindings.append(
+            Binding(
+                parameter=binding.group("parameter"),
+                kind=binding.group("kind"),
+                name=binding.group("name"),
+                line=number,
+            )
+        )
+        return
+
+    keyword = stripped.split(None, 1)[0]
+    target: str | None = None
+    if keyword == "remember":
+        match = _REMEMBER_RE.match(stripped)
+        target = match.group("label") if match else None
+    elif keyword == "ask":
+        match = _ASK_RE.match(stripped)
+        target = match.group("helper") if match else None
+    elif keyword == "for":
+        match = _FOR_EACH_RE.match(stripped)
+        if match:
+            statement = Statement(
+                keyword="for",
+                line=number,
+                text=stripped,
+                target=match.group("helper"),
+                collection=Binding(
+                    parameter=match.group("item"),
+                    kind=match.group("kind"),
+                    name=match.group("name"),
+                    line=number,
+                ),
+            )
+            script.statements.append(statement)
+            return
+        keyword = "unknown"
+    elif keyword == "keep":
+        match = _KEEP_RE.match(stripped)
+        target = match.group("label") if match else None
+    elif keyword == "show":
+        match = _SHOW_RE.match(stripped)
+        target = match.group("label") if match else None
+    elif keyword not in {"note", "raise"}:
+        keyword = "unknown"
+    script.statements.append(Statement(keyword=keyword, line=number, text=stripped, target=target))
+
+
+def required_features(script: MirageScript, *, has_inputs: bool = False) -> Set[str]:
+    """Return the prompt/tool requirement keys a script needs at runtime.
+
+    Keys take the form ``statement:<keyword>`` and ``tool:<name>``; ``always`` is
+    included unconditionally. ``has_inputs`` forces the input tools on when the
+    CLI advertises values the script itself does not declare.
+    """
+    features = {"always"}
+    features.update(f"statement:{keyword}" for keyword in script.statement_keywords())
+    features.update(f"tool:{name}" for name in _ALWAYS_TOOLS)
+
+    binds_inputs = any(
+        binding.kind in {"argument", "file"}
+        for statement in script.statements
+        for binding in statement.input_bindings()
+    )
+    if has_inputs or script.inputs or binds_inputs:
+        features.update(f"tool:{name}" for name in _INPUT_TOOLS)
+
+    if "statement:for" in features:
+        features.add("tool:map_helper")
+    for name in TOOL_NAMES:
+        if script.mentions(name):
+            features.add(f"tool:{name}")
+    return features
+
+
+def check_script(
+    script: MirageScript,
+    *,
+    argument_inputs: Mapping[str, str] | None = None,
+    file_inputs: Mapping[str, Path] | None = None,
+) -> List[Diagnostic]:
+    """Find mistakes that would otherwise only surface after paid model turns.
+
+    Declarations, helper calls and memory labels are always cross-checked. The
+    supplied ``--arg``/``--file`` values are only compared against ``inputs:``
+    when ``argument_inputs`` or ``file_inputs`` is given; pass neither to check
+    the script on its own (as an editor would).
+    """
+    checker = _ScriptChecker(script)
+    checker.check_structure()
+    if argument_inputs is not None or file_inputs is not None:
+        checker.check_supplied_inputs(dict(argument_inputs or {}), dict(file_inputs or {}))
+    return sorted(checker.diagnostics, key=lambda diagnostic: diagnostic.line)
+
+
+class _ScriptChecker:
+    def __init__(self, script: MirageScript) -> None:
+        self.script = script
+        self.diagnostics: List[Diagnostic] = []
+        self.declared: Dict[str, InputDecl] = {}
+        for decl in script.inputs:
+            if decl.name in self.declared:
+                self.warning(decl.line, f"Input '{decl.name}' is declared more than once")
+            self.declared.setdefault(decl.name, decl)
+
+    def error(self, line: int, message: str) -> None:
+        self.diagnostics.append(Diagnostic(line=line, severity="error", message=message))
+
+    def warning(self, line: int, message: str) -> None:
+        self.diagnostics.append(Diagnostic(line=line, severity="warning", message=message))
+
+    def check_structure(self) -> None:
+        if not self.script.has_begin:
+            self.error(1, "Program has no 'begin:' block")
+
+        memory: Set[str] = set()
+        has_answer = False
+        loops: Set[tuple[str | None, str]] = set()
+        for statement in self.script.statements:
+            if statement.collection is not None:
+                loop = (statement.target, statement.collection.name)
+                if loop in loops:
+                    self.error(
+                        statement.line,
+                        f"Helper '{statement.target}' is already mapped over"
+                        f" '{statement.collection.name}'; map_helper cannot tell them apart",
+                    )
+                loops.add(loop)
+            if statement.keyword == "unknown":
+                self.warning(statement.line, f"Unrecognised statement '{statement.text}'")
+            elif statement.keyword == "remember" and statement.target:
+                for placeholder in _PLACEHOLDER_RE.finditer(statement.text):
+                    name = placeholder.group("name")
+                    if name not in self.declared:
+                        self.warning(
+                            statement.line, f"Placeholder '{{{name}}}' is not a declared input"
+                        )
+                memory.add(statement.target)
+            elif statement.keyword in {"ask", "for"}:
+                self._check_ask(statement, memory)
+                has_answer = True
+            elif statement.keyword == "keep" and statement.target:
+                if not has_answer:
+                    self.warning(statement.line, "'keep answer' has no preceding 'ask'")
+                memory.add(statement.target)
+            elif statement.keyword == "show" and statement.target not in memory:
+                self.warning(
+                    statement.line, f"'show {statement.target}' refers to an unknown label"
+                )
+
+    def _check_source(self, binding: Binding, memory: Set[str]) -> None:
+        if binding.kind == "memory":
+            if binding.name not in memory:
+                self.error(
+                    binding.line, f"Memory label '{binding.name}' is not defined before use"
+                )
+            return
+        decl = self.declared.get(binding.name)
+        if decl is None:
+            self.error(binding.line, f"Input '{binding.name}' is not declared in 'inputs:'")
+        elif decl.kind != binding.kind:
+            self.error(
+                binding.line,
+                f"'{binding.name}' is declared as {decl.kind} input, not {binding.kind}",
+            )
+
+    def check_supplied_inputs(
+        self, argument_inputs: Dict[str, str], file_inputs: Dict[str, Path]
+    ) -> None:
+        for decl in self.script.inputs:
+            if decl.kind == "argument" and decl.name not in argument_inputs:
+                self.error(
+                    decl.line,
+                    f"Missing value for argument '{decl.name}' (use --arg {decl.name}=VALUE)",
+                )
+            elif decl.kind == "file":
+                path = file_inputs.get(decl.name)
+                if path is None:
+                    self.error(
+                        decl.line,
+                        f"Missing path for file '{decl.name}' (use --file {decl.name}=PATH)",
+                    )
+                elif not Path(path).is_file():
+                    self.error(decl.line, f"File input '{decl.name}' does not exist: {path}")
+        for name in sorted(set(argument_inputs) | set(file_inputs)):
+            if name not in self.declared:
+                self.warning(1, f"Input '{name}' is supplied but not declared in 'inputs:'")
+
+    def _check_ask(self, statement: Statement, memory: Set[str]) -> None:
+        helper = self.script.helpers.get(statement.target or "")
+        if helper is None:
+            self.error(statement.line, f"Helper '{statement.target}' is not defined")
+
+        bound: Set[str] = set()
+        if statement.collection is not None:
+            self._check_source(statement.collection, memory)
+            item_parameter = statement.item_parameter(helper)
+            if item_parameter is None:
+                if helper is not None:
+                    self.error(
+                        statement.line,
+                        f"Helper '{helper.name}' has no parameter left to receive"
+                        f" '{statement.collection.parameter}'",
+                    )
+            else:
+                bound.add(item_parameter)
+
+        for binding in statement.bindings:
+            bound.add(binding.parameter)
+            if helper is not None and binding.parameter not in helper.needs:
+                self.warning(
+                    binding.line,
+                    f"Helper '{helper.name}' does not declare 'needs {binding.parameter}'",
+                )
+            if binding.kind == "item":
+                loop = statement.collection
+                if loop is None or binding.name != loop.parameter:
+                    self.error(binding.line, f"'item {binding.name}' is not a loop variable here")
+                continue
+            self._check_source(binding, memory)
+
+        if helper is not None:
+            for parameter in helper.needs:
+                if parameter not in bound:
+                    self.warning(
+                        statement.line,
+                        f"Parameter '{parameter}' of helper '{helper.name}' is not bound",
+                    )
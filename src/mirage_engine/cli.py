@@ -5,10 +5,12 @@ import argparse
 import json
 import os
 import sys
+import time
 from pathlib import Path
 from typing import Dict
 
-from .interpreter import MirageInterpreter, MirageRuntimeError
+from .analysis import Diagnostic, check_script, parse_script
+from .interpreter import MirageInterpreter, MirageRuntimeError, measure_prompt_savings
 from .llm_client import OpenAIClient, OpenAIError
 
 
@@ -25,7 +27,12 @@ def load_env_file(env_path: Path) -> None:
 
 
 def build_argument_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(description="Run Mirage programs with GPT guidance")
+    parser = argparse.ArgumentParser(
+        description=(
+            "Run Mirage programs with GPT guidance."
+            " Use 'mirage check' to validate a program without running it."
+        )
+    )
     parser.add_argument("source", type=Path, help="Path to the .mirage program file")
     parser.add_argument(
         "--env",
@@ -34,6 +41,102 @@ def build_argument_parser() -> argparse.ArgumentParser:
         default=Path(".env"),
         help="Optional path to an environment file with OPENAI_API_KEY",
     )
+    _add_input_arguments(parser)
+    parser.add_argument(
+        "--debug-log",
+        dest="debug_log",
+        type=Path,
+        default=None,
+        help="Save the full LLM message transcript to the specified file",
+    )
+    parser.add_argument(
+        "--model",
+        default="gpt-5-mini",
+        help="Model for turns that may run helper reasoning (default: gpt-5-mini)",
+    )
+    parser.add_argument(
+        "--fast-model",
+        dest="fast_model",
+        default=None,
+        help=(
+            "Optional faster model for mechanical turns (fetching inputs, storing memories,"
+            " emitting output); defaults to --model"
+        ),
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        dest="hedge_percentile",
+        type=float,
+        default=None,
+        metavar="P",
+        help=(
+            "Issue a duplicate completion request when the first one is slower than the"
+            " P-th percentile of observed latencies, keeping whichever finishes first"
+        ),
+    )
+    parser.add_argument(
+        "--hedge-drain",
+        dest="hedge_drain",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help=(
+            "Wait up to SECONDS after the run for losing hedge requests to finish so their"
+            " tokens are counted (default: report them as pending without waiting)"
+        ),
+    )
+    parser.add_argument(
+        "--map-workers",
+        dest="map_workers",
+        type=_positive_int,
+        default=4,
+        metavar="N",
+        help="Maximum concurrent helper calls when expanding a 'for each' statement",
+    )
+    parser.add_argument(
+        "--prune-prompt",
+        dest="prune_prompt",
+        action="store_true",
+        help="Send only the prompt sections and tools the script actually uses",
+    )
+    parser.add_argument(
+        "--skip-check",
+        dest="skip_check",
+        action="store_true",
+        help="Skip the local preflight validation of the script and its inputs",
+    )
+    parser.add_argument(
+        "--dry-run",
+        dest="dry_run",
+        action="store_true",
+        help="Report prompt pruning savings for the script without calling the API",
+    )
+    return parser
+
+
+def build_check_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="mirage check",
+        description="Validate a Mirage program and its inputs without calling the API",
+    )
+    parser.add_argument("source", type=Path, help="Path to the .mirage program file")
+    _add_input_arguments(parser)
+    parser.add_argument(
+        "--static",
+        action="store_true",
+        help="Only check the script itself, not the supplied --arg/--file values",
+    )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=["text", "json"],
+        default="text",
+        help="Emit diagnostics as text lines or as a JSON array",
+    )
+    return parser
+
+
+def _add_input_arguments(parser: argparse.ArgumentParser) -> None:
     parser.add_argument(
         "--arg",
         dest="arg_inputs",
@@ -50,14 +153,29 @@ def build_argument_parser() -> argparse.ArgumentParser:
         metavar="NAME=PATH",
         help="Provide a path for an input file declared in the script",
     )
-    parser.add_argument(
-        "--debug-log",
-        dest="debug_log",
-        type=Path,
-        default=None,
-        help="Save the full LLM message transcript to the specified file",
+
+
+def _print_prompt_savings(source: Path, source_text: str, has_inputs: bool) -> None:
+    savings = measure_prompt_savings(parse_script(source_text), has_inputs=has_inputs)
+    dropped = ", ".join(savings.dropped_tools) or "(none)"
+    print(f"{source}:")
+    print(f"  system prompt: {savings.prompt_chars} -> {savings.pruned_prompt_chars} chars")
+    print(f"  tool schemas:  {savings.tool_chars} -> {savings.pruned_tool_chars} chars")
+    print(f"  dropped tools: {dropped}")
+    print(
+        f"  saved per turn: {savings.saved_chars} chars"
+        f" (~{savings.saved_tokens_estimate} tokens)"
     )
-    return parser
+
+
+def _positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
 
 
 def _parse_assignments(pairs: list[str], *, label: str) -> Dict[str, str]:
@@ -73,40 +191,117 @@ def _parse_assignments(pairs: list[str], *, label: str) -> Dict[str, str]:
     return assignments
 
 
-def main(argv: list[str] | None = None) -> int:
-    parser = build_argument_parser()
-    args = parser.parse_args(argv)
-
-    load_env_file(args.env_path)
-
+def _read_source(parser: argparse.ArgumentParser, source: Path) -> str:
     try:
-        source_text = args.source.read_text(encoding="utf-8")
+        return source.read_text(encoding="utf-8")
     except FileNotFoundError:
-        parser.error(f"No such program file: {args.source}")
+        parser.error(f"No such program file: {source}")
     except OSError as error:
         parser.error(f"Failed to read program file: {error}")
 
-    try:
-        client = OpenAIClient(model="gpt-5-mini", temperature=1.0)
-    except OpenAIError as error:
-        parser.error(str(error))
 
+def _read_inputs(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> tuple[Dict[str, str], Dict[str, Path]]:
     try:
         argument_values = _parse_assignments(args.arg_inputs, label="arg")
         file_paths = _parse_assignments(args.file_inputs, label="file")
     except ValueError as error:
         parser.error(str(error))
+    return argument_values, {
+        name: Path(raw_path).expanduser() for name, raw_path in file_paths.items()
+    }
+
+
+def check_main(argv: list[str]) -> int:
+    parser = build_check_parser()
+    args = parser.parse_args(argv)
+    source_text = _read_source(parser, args.source)
 
-    expanded_files: Dict[str, Path] = {}
-    for name, raw_path in file_paths.items():
-        expanded_files[name] = Path(raw_path).expanduser()
+    if args.static:
+        diagnostics = check_script(parse_script(source_text))
+    else:
+        argument_values, file_paths = _read_inputs(parser, args)
+        diagnostics = check_script(
+            parse_script(source_text), argument_inputs=argument_values, file_inputs=file_paths
+        )
+
+    if args.output_format == "json":
+        json.dump([vars(diagnostic) for diagnostic in diagnostics], sys.stdout)
+        sys.stdout.write("\n")
+    else:
+        for diagnostic in diagnostics:
+            print(diagnostic.format(args.source))
+    return 1 if _has_errors(diagnostics) else 0
+
+
+def _has_errors(diagnostics: list[Diagnostic]) -> bool:
+    return any(diagnostic.severity == "error" for diagnostic in diagnostics)
+
+
+def main(argv: list[str] | None = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "check":
+        return check_main(argv[1:])
+
+    parser = build_argument_parser()
+    args = parser.parse_args(argv)
+
+    load_env_file(args.env_path)
+
+    source_text = _read_source(parser, args.source)
+    argument_values, expanded_files = _read_inputs(parser, args)
+
+    if not args.skip_check:
+        # A dry run never reads the inputs, so only the script itself is checked.
+        diagnostics = check_script(
+            parse_script(source_text),
+            argument_inputs=None if args.dry_run else argument_values,
+            file_inputs=None if args.dry_run else expanded_files,
+        )
+        for diagnostic in diagnostics:
+            if diagnostic.severity != "error":
+                print(diagnostic.format(args.source), file=sys.stderr)
+        if _has_errors(diagnostics):
+            parser.error(
+                "preflight check failed:\n"
+                + "\n".join(
+                    diagnostic.format(args.source)
+                    for diagnostic in diagnostics
+                    if diagnostic.severity == "error"
+                )
+            )
+
+    if args.dry_run:
+        _print_prompt_savings(args.source, source_text, bool(argument_values or expanded_files))
+        return 0
+
+    try:
+        client = OpenAIClient(
+            model=args.model,
+            temperature=1.0,
+            hedge_percentile=args.hedge_percentile,
+        )
+        fast_client = None
+        if args.fast_model:
+            fast_client = OpenAIClient(
+                model=args.fast_model,
+                temperature=1.0,
+                hedge_percentile=args.hedge_percentile,
+            )
+    except OpenAIError as error:
+        parser.error(str(error))
 
     interpreter = MirageInterpreter(
         source_path=args.source,
         source_text=source_text,
         client=client,
+        fast_client=fast_client,
         argument_inputs=argument_values,
         file_inputs=expanded_files,
+        prune_prompt=args.prune_prompt,
+        map_workers=args.map_workers,
     )
 
     try:
@@ -117,6 +312,31 @@ def main(argv: list[str] | None = None) -> int:
     for line in result.outputs:
         print(line)
 
+    if args.hedge_percentile is not None:
+        # Losing requests report their tokens only once they return; one deadline
+        # covers both clients so --fast-model does not double the wait.
+        deadline = time.monotonic() + max(0.0, args.hedge_drain)
+        for hedged in filter(None, (client, fast_client)):
+            pending = hedged.drain_hedges(timeout=max(0.0, deadline - time.monotonic()))
+            stats = hedged.hedge_stats
+            print(
+                f"[hedging {hedged.model}] requests={stats.requests} fired={stats.hedges_fired}"
+                f" won={stats.hedges_won} wasted_tokens={stats.wasted.total_tokens}"
+                f" still_pending={pending}",
+                file=sys.stderr,
+            )
+
+    if fast_client is not None:
+        for tier, tier_stats in sorted(result.tier_stats.items()):
+            print(
+                f"[routing {tier}:{tier_stats.model}] turns={tier_stats.turns}"
+                f" mean_latency={tier_stats.mean_latency:.2f}s"
+                f" map_calls={tier_stats.map_calls}"
+                f" prompt_tokens={tier_stats.prompt_tokens}"
+                f" completion_tokens={tier_stats.completion_tokens}",
+                file=sys.stderr,
+            )
+
     if args.debug_log:
         try:
             args.debug_log.parent.mkdir(parents=True, exist_ok=True)
@@ -2,24 +2,220 @@
 from __future__ import annotations
 
 import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Sequence
+from typing import Any, Dict, List, Sequence, Set, Tuple
 
+from .analysis import Binding, MirageScript, Statement, parse_script, required_features
 from .llm_client import OpenAIClient
 
-_SYSTEM_PROMPT_CACHE: str | None = None
+_PROMPT_SECTIONS_CACHE: List[Tuple[str, str]] | None = None
+_SECTION_MARKER = "@@ "
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+# Prompt sections and tools that only exist for `for each`; even an unpruned run
+# leaves them out unless the script uses the statement.
+_FOR_EACH_FEATURES = frozenset({"statement:for", "tool:map_helper"})
+_MAP_WORKER_PROMPT = (
+    "You are Mirage, executing one call of a MirageScript helper. Follow the helper prompt"
+    " literally using the parameter values supplied, and reply with the helper's return"
+    " value only. Do not describe what you are doing."
+)
+
+_TOOL_SCHEMAS: List[Dict[str, Any]] = [
+    {
+        "type": "function",
+        "function": {
+            "name": "emit_output",
+            "description": "Append a human-visible line to the terminal output.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "text": {
+                        "type": "string",
+                        "description": "Line to print back to the programmer.",
+                    }
+                },
+                "required": ["text"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_inputs",
+            "description": "List the available argument and file input names.",
+            "parameters": {"type": "object", "properties": {}},
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_input",
+            "description": (
+                "Fetch the value for a declared argument or file input."
+                " File inputs return their full text content."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "kind": {
+                        "type": "string",
+                        "enum": ["argument", "file"],
+                        "description": "Optional explicit input kind.",
+                    },
+                },
+                "required": ["name"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_source",
+            "description": "Retrieve the entire Mirage source file again if needed.",
+            "parameters": {"type": "object", "properties": {}},
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_file",
+            "description": "Read an arbitrary UTF-8 text file relative to the program path.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string"},
+                },
+                "required": ["path"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "save_file",
+            "description": "Write UTF-8 content to a file relative to the program path.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string"},
+                    "content": {"type": "string"},
+                },
+                "required": ["path", "content"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "map_helper",
+            "description": (
+                "Run a helper once per element for a `for each` statement, in parallel,"
+                " and return the results in order."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "helper": {"type": "string"},
+                    "source": {
+                        "type": "string",
+                        "description": "Name of the list the statement iterates (after `in`).",
+                    },
+                    "items": {
+                        "type": "array",
+                        "items": {},
+                        "description": "Elements to iterate when looping over a memory label.",
+                    },
+                    "bindings": {
+                        "type": "object",
+                        "description": "Values for the `memory` bindings of the statement.",
+                    },
+                },
+                "required": ["helper", "source"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "raise_error",
+            "description": "Abort execution and surface a message to the human programmer.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "message": {"type": "string"},
+                },
+                "required": ["message"],
+                "additionalProperties": False,
+            },
+        },
+    },
+]
 
 
 class MirageRuntimeError(RuntimeError):
     """Raised when the interpreter session cannot continue."""
 
 
+@dataclass
+class TierStats:
+    """Per-tier figures. ``turns``/``seconds`` cover conversation turns only;
+    ``for each`` helper calls are tallied under ``map_calls``/``map_seconds``.
+    Token counts include both."""
+
+    model: str | None = None
+    turns: int = 0
+    seconds: float = 0.0
+    map_calls: int = 0
+    map_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.seconds / self.turns if self.turns else 0.0
+
+    @property
+    def mean_map_latency(self) -> float:
+        return self.map_seconds / self.map_calls if self.map_calls else 0.0
+
+
 @dataclass
 class RunResult:
     outputs: List[str] = field(default_factory=list)
     final_message: str | None = None
     messages: List[Dict[str, Any]] = field(default_factory=list)
+    tier_stats: Dict[str, TierStats] = field(default_factory=dict)
+
+
+@dataclass
+class PromptSavings:
+    prompt_chars: int
+    pruned_prompt_chars: int
+    tool_chars: int
+    pruned_tool_chars: int
+    dropped_tools: List[str] = field(default_factory=list)
+
+    @property
+    def saved_chars(self) -> int:
+        return (self.prompt_chars + self.tool_chars) - (
+            self.pruned_prompt_chars + self.pruned_tool_chars
+        )
+
+    @property
+    def saved_tokens_estimate(self) -> int:
+        # Roughly four characters per token for English prose and JSON schemas.
+        return self.saved_chars // 4
 
 
 class MirageInterpreter:
@@ -31,15 +227,32 @@ class MirageInterpreter:
         source_path: Path,
         source_text: str,
         client: OpenAIClient,
+        fast_client: OpenAIClient | None = None,
         argument_inputs: Dict[str, str] | None = None,
         file_inputs: Dict[str, Path] | None = None,
+        prune_prompt: bool = False,
+        map_workers: int = 4,
     ) -> None:
         self.source_path = source_path
         self.source_text = source_text
         self.client = client
+        self.fast_client = fast_client
         self.argument_inputs = dict(argument_inputs or {})
         self.file_inputs = dict(file_inputs or {})
+        self.prune_prompt = prune_prompt
+        if map_workers < 1:
+            raise ValueError("map_workers must be at least 1")
+        self.map_workers = map_workers
         self.outputs: List[str] = []
+        self.script = parse_script(source_text)
+        self.tier_stats: Dict[str, TierStats] = {}
+        self._fetched_inputs: Set[str] = set()
+        # Helpers allowed to stream through emit_output break the one-line-per-show
+        # count the router relies on.
+        self._outputs_track_shows = not any(
+            "emit_output" in helper.prompt for helper in self.script.helpers.values()
+        )
+        self._stats_lock = threading.Lock()
 
     def run(self) -> RunResult:
         messages: List[Dict[str, Any]] = [
@@ -50,7 +263,8 @@ class MirageInterpreter:
         final_message: str | None = None
 
         while True:
-            choice = self.client.complete(messages, tools=self._tool_schemas())
+            tier = self._route_turn()
+            choice = self._complete(tier, messages, tools=self._tool_schemas())
             assistant_message = choice.get("message")
             if not isinstance(assistant_message, dict):
                 raise MirageRuntimeError("Assistant response missing message payload")
@@ -67,12 +281,148 @@ class MirageInterpreter:
                 final_message = content
             break
 
-        return RunResult(outputs=self.outputs, final_message=final_message, messages=messages)
+        return RunResult(
+            outputs=self.outputs,
+            final_message=final_message,
+            messages=messages,
+            tier_stats=self.tier_stats,
+        )
+
+    def _route_turn(self) -> str:
+        """Pick the model tier for the next turn: ``strong`` or ``fast``.
+
+        Each ``show`` normally produces one ``emit_output``, so the number of lines
+        emitted so far tells which ``show`` statements have run. When that count
+        cannot be trusted (a helper streams output itself, or a turn emitted more
+        lines than the ``show`` statements it could have reached) every remaining
+        turn goes to the strong tier. A helper call
+        (``ask`` or ``for each``) is pending while the label it keeps has not been
+        shown yet; reasoning does not carry over between turns, so the strong tier
+        stays in charge until every pending helper reachable before the next ``show``
+        is done. The one exception is a turn where the first pending helper still
+        needs an input the model has not fetched, either bound directly to an ``ask``
+        or through a ``{placeholder}`` in an earlier ``remember``: it can only call
+        ``get_input``. A ``for each`` never waits on its own argument or file
+        bindings, because ``map_helper`` reads those itself.
+        Everything else (storing memories, printing) goes to the fast tier. Without
+        a ``fast_client`` both tiers use ``client`` but are still tallied apart.
+        """
+        statements = self.script.statements
+        if not statements:
+            return "strong"
+
+        emitted = len(self.outputs)
+        if not self._outputs_track_shows or emitted > len(self._show_indices()):
+            return "strong"
+        shows_seen = 0
+        shown: Set[str] = set()
+        calls: List[Tuple[Statement, str | None, bool]] = []
+        for index, statement in enumerate(statements):
+            if statement.keyword == "show":
+                if shows_seen == emitted:
+                    break
+                shows_seen += 1
+                if statement.target:
+                    shown.add(statement.target)
+            elif statement.keyword in {"ask", "for"}:
+                calls.append((statement, _kept_label(statements, index), shows_seen == emitted))
+
+        pending = [
+            statement
+            for statement, label, in_current_segment in calls
+            if (label is not None and label not in shown) or (label is None and in_current_segment)
+        ]
+        if not pending:
+            return "fast"
+        needed: Set[str] = set()
+        if pending[0].keyword == "ask":
+            needed.update(
+                binding.name
+                for binding in pending[0].bindings
+                if binding.kind in {"argument", "file"}
+            )
+        declared = {decl.name for decl in self.script.inputs}
+        for statement in statements:
+            if statement is pending[0]:
+                break
+            if statement.keyword == "remember":
+                needed.update(set(_PLACEHOLDER_RE.findall(statement.text)) & declared)
+        return "fast" if needed - self._fetched_inputs else "strong"
+
+    def _client_for(self, tier: str) -> OpenAIClient:
+        if tier == "fast" and self.fast_client is not None:
+            return self.fast_client
+        return self.client
+
+    def _complete(
+        self,
+        tier: str,
+        messages: List[Dict[str, Any]],
+        *,
+        tools: Sequence[Dict[str, Any]] | None = None,
+        map_call: bool = False,
+    ) -> Dict[str, Any]:
+        client = self._client_for(tier)
+        usage = getattr(client, "usage", None)
+        prompt_before = getattr(usage, "prompt_tokens", 0)
+        completion_before = getattr(usage, "completion_tokens", 0)
+        started = time.monotonic()
+        choice = client.complete(messages, tools=tools)
+        elapsed = time.monotonic() - started
+        with self._stats_lock:
+            stats = self.tier_stats.setdefault(
+                tier, TierStats(model=getattr(client, "model", None))
+            )
+            if map_call:
+                # Concurrent workers share the client; _tool_map_helper adds their
+                # tokens once the pool drains.
+                stats.map_calls += 1
+                stats.map_seconds += elapsed
+                return choice
+            stats.turns += 1
+            stats.seconds += elapsed
+            if usage is not None:
+                stats.prompt_tokens += usage.prompt_tokens - prompt_before
+                stats.completion_tokens += usage.completion_tokens - completion_before
+        return choice
 
     def _handle_tool_calls(
         self,
         messages: List[Dict[str, Any]],
         tool_calls: Sequence[Dict[str, Any]],
+    ) -> None:
+        reachable = self._reachable_shows(len(self.outputs))
+        emitted_before = len(self.outputs)
+        try:
+            self._run_tool_calls(messages, tool_calls)
+        finally:
+            if len(self.outputs) - emitted_before > reachable:
+                self._outputs_track_shows = False
+
+    def _show_indices(self) -> List[int]:
+        return [
+            index
+            for index, statement in enumerate(self.script.statements)
+            if statement.keyword == "show"
+        ]
+
+    def _reachable_shows(self, emitted: int) -> int:
+        """Count the ``show`` statements a turn can run before the next helper call."""
+        show_indices = self._show_indices()
+        if emitted >= len(show_indices):
+            return 0
+        reachable = 0
+        for statement in self.script.statements[show_indices[emitted] :]:
+            if statement.keyword in {"ask", "for"}:
+                break
+            if statement.keyword == "show":
+                reachable += 1
+        return reachable
+
+    def _run_tool_calls(
+        self,
+        messages: List[Dict[str, Any]],
+        tool_calls: Sequence[Dict[str, Any]],
     ) -> None:
         for call in tool_calls:
             if not isinstance(call, dict):
@@ -112,13 +462,18 @@ class MirageInterpreter:
         if name == "list_inputs":
             return self._tool_list_inputs()
         if name == "get_input":
-            return self._tool_get_input(arguments)
+            result = self._tool_get_input(arguments)
+            # Record missing inputs too: asking again will not make them appear.
+            self._fetched_inputs.add(result["name"])
+            return result
         if name == "read_source":
             return self._tool_read_source()
         if name == "read_file":
             return self._tool_read_file(arguments)
         if name == "save_file":
             return self._tool_save_file(arguments)
+        if name == "map_helper":
+            return self._tool_map_helper(arguments)
         if name == "raise_error":
             self._tool_raise_error(arguments)
         raise MirageRuntimeError(f"Assistant requested unknown tool '{name}'")
@@ -211,6 +566,130 @@ class MirageInterpreter:
             "bytes_written": len(content.encode("utf-8")),
         }
 
+    def _tool_map_helper(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        helper_name = arguments.get("helper")
+        if not isinstance(helper_name, str) or not helper_name.strip():
+            raise MirageRuntimeError("map_helper requires a non-empty 'helper'")
+        source = arguments.get("source")
+        if not isinstance(source, str) or not source.strip():
+            raise MirageRuntimeError("map_helper requires a non-empty 'source'")
+        candidates = [
+            (candidate, candidate.collection)
+            for candidate in self.script.statements
+            if candidate.keyword == "for"
+            and candidate.target == helper_name
+            and candidate.collection is not None
+            and candidate.collection.name == source
+        ]
+        if not candidates:
+            raise MirageRuntimeError(
+                f"No 'for each' statement asks helper '{helper_name}' over '{source}'"
+            )
+        if len(candidates) > 1:
+            raise MirageRuntimeError(
+                f"Several 'for each' statements ask helper '{helper_name}' over '{source}'"
+            )
+        statement, collection = candidates[0]
+        helper = self.script.helpers.get(helper_name)
+        if helper is None:
+            raise MirageRuntimeError(f"Helper '{helper_name}' is not defined")
+        item_parameter = statement.item_parameter(helper)
+        if item_parameter is None:
+            raise MirageRuntimeError(f"Helper '{helper_name}' has no parameter for the loop item")
+
+        items = self._map_items(collection, arguments.get("items"))
+        shared = self._map_bindings(statement, arguments.get("bindings"))
+
+        def run_one(item: Any) -> str:
+            values = dict(shared)
+            values[item_parameter] = item
+            choice = self._complete(
+                "strong",
+                [
+                    {"role": "system", "content": _MAP_WORKER_PROMPT},
+                    {
+                        "role": "user",
+                        "content": (
+                            f"Helper: {helper.name}\n"
+                            f"Prompt:\n<<<\n{helper.prompt}\n>>>\n\n"
+                            "Parameters (JSON):\n"
+                            f"{json.dumps(values, ensure_ascii=False, indent=2)}"
+                        ),
+                    },
+                ],
+                map_call=True,
+            )
+            message = choice.get("message")
+            content = message.get("content") if isinstance(message, dict) else None
+            if not isinstance(content, str):
+                raise MirageRuntimeError(f"Helper '{helper.name}' returned no content")
+            return content
+
+        # Workers share one client, so tokens are attributed once the pool drains
+        # rather than per call.
+        usage = getattr(self.client, "usage", None)
+        prompt_before = getattr(usage, "prompt_tokens", 0)
+        completion_before = getattr(usage, "completion_tokens", 0)
+        workers = min(self.map_workers, len(items)) or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mirage-map") as pool:
+            results = list(pool.map(run_one, items))
+        if usage is not None and "strong" in self.tier_stats:
+            stats = self.tier_stats["strong"]
+            stats.prompt_tokens += usage.prompt_tokens - prompt_before
+            stats.completion_tokens += usage.completion_tokens - completion_before
+        return {"helper": helper_name, "count": len(results), "results": results}
+
+    def _map_items(self, collection: Binding, supplied: Any) -> List[Any]:
+        if collection.kind == "memory":
+            if not isinstance(supplied, list):
+                raise MirageRuntimeError(
+                    f"map_helper requires 'items' as a list for memory '{collection.name}'"
+                )
+            return supplied
+
+        if collection.kind == "argument":
+            if collection.name not in self.argument_inputs:
+                raise MirageRuntimeError(f"Argument '{collection.name}' was not provided")
+            raw = self.argument_inputs[collection.name]
+        else:
+            payload = self._tool_get_input({"name": collection.name, "kind": "file"})
+            if not payload["available"]:
+                raise MirageRuntimeError(f"File input '{collection.name}' was not provided")
+            raw = payload["value"]
+
+        try:
+            parsed = json.loads(raw)
+        except json.JSONDecodeError:
+            parsed = None
+        if isinstance(parsed, list):
+            return parsed
+        if collection.kind == "file":
+            # Plain text files are split into paragraphs.
+            return [block.strip() for block in re.split(r"\n\s*\n", raw) if block.strip()]
+        raise MirageRuntimeError(
+            f"Argument '{collection.name}' must be a JSON array to use with 'for each'"
+        )
+
+    def _map_bindings(self, statement: Statement, supplied: Any) -> Dict[str, Any]:
+        supplied = supplied if isinstance(supplied, dict) else {}
+        values: Dict[str, Any] = {}
+        for binding in statement.bindings:
+            if binding.kind == "item":
+                continue
+            if binding.kind == "memory":
+                if binding.parameter not in supplied:
+                    raise MirageRuntimeError(
+                        f"map_helper requires bindings.{binding.parameter}"
+                        f" (memory {binding.name})"
+                    )
+                values[binding.parameter] = supplied[binding.parameter]
+                continue
+            payload = self._tool_get_input({"name": binding.name, "kind": binding.kind})
+            if not payload["available"]:
+                raise MirageRuntimeError(f"Input '{binding.name}' was not provided")
+            values[binding.parameter] = payload["value"]
+        return values
+
     def _tool_raise_error(self, arguments: Dict[str, Any]) -> None:
         message = arguments.get("message")
         if not isinstance(message, str) or not message.strip():
@@ -228,15 +707,18 @@ class MirageInterpreter:
         local_candidate = (self.source_path.parent / candidate).resolve()
         return local_candidate
 
+    def _required_features(self) -> Set[str]:
+        return required_features(
+            self.script,
+            has_inputs=bool(self.argument_inputs or self.file_inputs),
+        )
+
+    def _active_features(self) -> Set[str]:
+        features = self._required_features()
+        return features if self.prune_prompt else _unpruned_features(features)
+
     def _system_prompt(self) -> str:
-        global _SYSTEM_PROMPT_CACHE
-        if _SYSTEM_PROMPT_CACHE is None:
-            prompt_path = Path(__file__).with_name("system_prompt.txt")
-            try:
-                _SYSTEM_PROMPT_CACHE = prompt_path.read_text(encoding="utf-8")
-            except OSError as error:
-                raise MirageRuntimeError(f"Failed to load system prompt: {error}")
-        return _SYSTEM_PROMPT_CACHE
+        return _assemble_prompt(self._active_features())
 
     def _initial_user_message(self) -> str:
         argument_names = ", ".join(sorted(self.argument_inputs)) or "(none provided)"
@@ -250,112 +732,97 @@ class MirageInterpreter:
             "Inputs advertised by the CLI flags:\n"
             f"- arguments: {argument_names}\n"
             f"- files: {file_names}\n"
-            "Use list_inputs and get_input to inspect their values when needed."
+            + (
+                "Use list_inputs and get_input to inspect their values when needed."
+                if self._offers_tool("get_input")
+                else "This program takes no inputs."
+            )
         )
 
+    def _offers_tool(self, name: str) -> bool:
+        return any(schema["function"]["name"] == name for schema in self._tool_schemas())
+
     def _tool_schemas(self) -> Sequence[Dict[str, Any]]:
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "emit_output",
-                    "description": "Append a human-visible line to the terminal output.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "text": {
-                                "type": "string",
-                                "description": "Line to print back to the programmer.",
-                            }
-                        },
-                        "required": ["text"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_inputs",
-                    "description": "List the available argument and file input names.",
-                    "parameters": {"type": "object", "properties": {}},
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_input",
-                    "description": (
-                        "Fetch the value for a declared argument or file input."
-                        " File inputs return their full text content."
-                    ),
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string"},
-                            "kind": {
-                                "type": "string",
-                                "enum": ["argument", "file"],
-                                "description": "Optional explicit input kind.",
-                            },
-                        },
-                        "required": ["name"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "read_source",
-                    "description": "Retrieve the entire Mirage source file again if needed.",
-                    "parameters": {"type": "object", "properties": {}},
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "read_file",
-                    "description": "Read an arbitrary UTF-8 text file relative to the program path.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "path": {"type": "string"},
-                        },
-                        "required": ["path"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "save_file",
-                    "description": "Write UTF-8 content to a file relative to the program path.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "path": {"type": "string"},
-                            "content": {"type": "string"},
-                        },
-                        "required": ["path", "content"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "raise_error",
-                    "description": "Abort execution and surface a message to the human programmer.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "message": {"type": "string"},
-                        },
-                        "required": ["message"],
-                        "additionalProperties": False,
-                    },
-                },
-            },
-        ]
+        return _select_tools(_TOOL_SCHEMAS, self._active_features())
+
+
+def _kept_label(statements: Sequence[Statement], index: int) -> str | None:
+    """Return the ``keep answer as`` label that stores the helper call at ``index``."""
+    for statement in statements[index + 1 :]:
+        if statement.keyword == "keep":
+            return statement.target
+        if statement.keyword in {"ask", "for"}:
+            return None
+    return None
+
+
+def measure_prompt_savings(script: MirageScript, *, has_inputs: bool = False) -> PromptSavings:
+    """Compare the full prompt and tool list against the pruned variants for a script."""
+    features = required_features(script, has_inputs=has_inputs)
+    full_features = _unpruned_features(features)
+    full_tools = _select_tools(_TOOL_SCHEMAS, full_features)
+    pruned_tools = _select_tools(_TOOL_SCHEMAS, features)
+    kept = {schema["function"]["name"] for schema in pruned_tools}
+    return PromptSavings(
+        prompt_chars=len(_assemble_prompt(full_features)),
+        pruned_prompt_chars=len(_assemble_prompt(features)),
+        tool_chars=len(json.dumps(full_tools)),
+        pruned_tool_chars=len(json.dumps(pruned_tools)),
+        dropped_tools=[
+            schema["function"]["name"]
+            for schema in full_tools
+            if schema["function"]["name"] not in kept
+        ],
+    )
+
+
+def _unpruned_features(features: Set[str]) -> Set[str]:
+    """Every prompt section and tool, minus the ``for each`` ones a script does not use."""
+    everything = {requirement for requirement, _ in _prompt_sections()}
+    everything.update(f"tool:{schema['function']['name']}" for schema in _TOOL_SCHEMAS)
+    return everything - (_FOR_EACH_FEATURES - features)
+
+
+def _prompt_sections() -> List[Tuple[str, str]]:
+    """Split system_prompt.txt into ``(requirement, text)`` pairs.
+
+    Each ``@@ <requirement>`` line opens a section that is only sent when the
+    script needs that statement or tool; ``@@ always`` sections are never pruned.
+    """
+    global _PROMPT_SECTIONS_CACHE
+    if _PROMPT_SECTIONS_CACHE is None:
+        prompt_path = Path(__file__).with_name("system_prompt.txt")
+        try:
+            text = prompt_path.read_text(encoding="utf-8")
+        except OSError as error:
+            raise MirageRuntimeError(f"Failed to load system prompt: {error}")
+        sections: List[Tuple[str, str]] = []
+        requirement = "always"
+        lines: List[str] = []
+        for line in text.splitlines(keepends=True):
+            if line.startswith(_SECTION_MARKER):
+                if lines:
+                    sections.append((requirement, "".join(lines)))
+                requirement = line[len(_SECTION_MARKER) :].strip()
+                lines = []
+            else:
+                lines.append(line)
+        if lines:
+            sections.append((requirement, "".join(lines)))
+        _PROMPT_SECTIONS_CACHE = sections
+    return _PROMPT_SECTIONS_CACHE
+
+
+def _assemble_prompt(features: Set[str]) -> str:
+    text = "".join(
+        section for requirement, section in _prompt_sections() if requirement in features
+    )
+    # Sections carry their own separating blank lines; collapse the doubles left
+    # where a pruned neighbour used to sit.
+    return re.sub(r"\n{3,}", "\n\n", text)
+
+
+def _select_tools(
+    schemas: Sequence[Dict[str, Any]], features: Set[str]
+) -> List[Dict[str, Any]]:
+    return [schema for schema in schemas if f"tool:{schema['function']['name']}" in features]
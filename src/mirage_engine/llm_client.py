@@ -2,30 +2,121 @@
 from __future__ import annotations
 
 import json
+import math
 import os
+import queue
+import threading
+import time
 import urllib.error
 import urllib.request
-from typing import Any, Dict, Sequence
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Sequence, Set
 
 
 class OpenAIError(RuntimeError):
     """Raised when the OpenAI API returns an error."""
 
 
+@dataclass
+class TokenUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, usage: Any) -> None:
+        if not isinstance(usage, dict):
+            return
+        self.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+        self.completion_tokens += int(usage.get("completion_tokens") or 0)
+
+
+@dataclass
+class HedgeStats:
+    """Accounting for duplicate requests issued to cut tail latency."""
+
+    requests: int = 0
+    hedges_fired: int = 0
+    hedges_won: int = 0
+    wasted: TokenUsage = field(default_factory=TokenUsage)
+
+
+class LatencyHistogram:
+    """Rolling window of request latencies used to pick the hedge delay."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(0, math.ceil(percent / 100 * len(samples)) - 1)
+        return samples[min(rank, len(samples) - 1)]
+
+
+class _Attempt:
+    """One in-flight copy of a hedged request."""
+
+    def __init__(self) -> None:
+        self.thread: threading.Thread | None = None
+        self.parsed: Dict[str, Any] | None = None
+        self.error: BaseException | None = None
+        self.done = False
+        self.abandoned = False
+
+    def result(self) -> Dict[str, Any]:
+        if self.error is not None:
+            raise self.error
+        assert self.parsed is not None
+        return self.parsed
+
+
 class OpenAIClient:
     def __init__(
         self,
         api_key: str | None = None,
         model: str = "gpt-5-mini",
         temperature: float = 1.0,
+        *,
+        timeout: float = 60.0,
+        hedge_percentile: float | None = None,
+        hedge_initial_delay: float = 20.0,
+        hedge_min_samples: int = 5,
     ):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise OpenAIError(
                 "OPENAI_API_KEY is not set. Provide one via the environment or .env file."
             )
+        if hedge_percentile is not None and not 0 < hedge_percentile < 100:
+            raise OpenAIError("hedge_percentile must be between 0 and 100")
         self.model = model
         self.temperature = temperature
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_initial_delay = hedge_initial_delay
+        self.hedge_min_samples = hedge_min_samples
+        # Tool-less requests (e.g. for-each helper calls) are far shorter than full
+        # turns, so each request shape gets its own hedge delay.
+        self.latencies = LatencyHistogram()
+        self.toolless_latencies = LatencyHistogram()
+        self.usage = TokenUsage()
+        self.hedge_stats = HedgeStats()
+        self._stats_lock = threading.Lock()
+        self._outstanding: Set[_Attempt] = set()
 
     def complete(
         self,
@@ -44,6 +135,117 @@ class OpenAIClient:
         if tool_choice:
             payload["tool_choice"] = tool_choice
         data = json.dumps(payload).encode("utf-8")
+
+        latencies = self.latencies if tools else self.toolless_latencies
+        if self.hedge_percentile is None:
+            parsed = self._timed_send(data, latencies)
+        else:
+            parsed = self._hedged_send(data, latencies)
+
+        with self._stats_lock:
+            self.usage.add(parsed.get("usage"))
+
+        try:
+            return parsed["choices"][0]
+        except (KeyError, IndexError, TypeError) as error:
+            raise OpenAIError(f"Unexpected OpenAI response: {parsed}") from error
+
+    def hedge_delay(self, latencies: LatencyHistogram | None = None) -> float:
+        """Seconds to wait on the primary request before firing a duplicate."""
+        latencies = self.latencies if latencies is None else latencies
+        if self.hedge_percentile is None or len(latencies) < self.hedge_min_samples:
+            return self.hedge_initial_delay
+        observed = latencies.percentile(self.hedge_percentile)
+        return self.hedge_initial_delay if observed is None else observed
+
+    def drain_hedges(self, timeout: float) -> int:
+        """Wait up to ``timeout`` seconds for abandoned hedge requests to finish.
+
+        Their token usage is only known once they return, so call this before
+        reporting ``hedge_stats``. Returns how many are still in flight.
+        """
+        deadline = time.monotonic() + timeout
+        with self._stats_lock:
+            outstanding = list(self._outstanding)
+        for attempt in outstanding:
+            if attempt.thread is not None:
+                attempt.thread.join(max(0.0, deadline - time.monotonic()))
+        with self._stats_lock:
+            return len(self._outstanding)
+
+    def _hedged_send(self, data: bytes, latencies: LatencyHistogram) -> Dict[str, Any]:
+        # urllib cannot abort a request that is already on the wire, so the losing
+        # request is abandoned rather than interrupted. Attempts run on daemon threads
+        # so an abandoned one never holds up interpreter exit; its token usage is
+        # recorded as hedging overhead when (and if) it returns.
+        finished: queue.Queue[_Attempt] = queue.Queue()
+        primary = self._start_attempt(data, latencies, finished)
+        try:
+            first: _Attempt | None = finished.get(timeout=self.hedge_delay(latencies))
+        except queue.Empty:
+            first = None
+        with self._stats_lock:
+            self.hedge_stats.requests += 1
+        if first is not None:
+            return first.result()
+
+        backup = self._start_attempt(data, latencies, finished)
+        with self._stats_lock:
+            self.hedge_stats.hedges_fired += 1
+
+        first_error: BaseException | None = None
+        for _ in range(2):
+            attempt = finished.get()
+            if attempt.error is not None:
+                first_error = first_error or attempt.error
+                continue
+            with self._stats_lock:
+                if attempt is backup:
+                    self.hedge_stats.hedges_won += 1
+                loser = primary if attempt is backup else backup
+                if loser.done:
+                    self._record_wasted(loser)
+                else:
+                    loser.abandoned = True
+                    self._outstanding.add(loser)
+            return attempt.result()
+        assert first_error is not None
+        raise first_error
+
+    def _start_attempt(
+        self, data: bytes, latencies: LatencyHistogram, finished: queue.Queue[_Attempt]
+    ) -> _Attempt:
+        attempt = _Attempt()
+
+        def run() -> None:
+            try:
+                attempt.parsed = self._timed_send(data, latencies)
+            except Exception as error:  # re-raised on the caller's thread
+                attempt.error = error
+            with self._stats_lock:
+                attempt.done = True
+                if attempt.abandoned:
+                    self._outstanding.discard(attempt)
+                    self._record_wasted(attempt)
+                    return
+            finished.put(attempt)
+
+        attempt.thread = threading.Thread(target=run, name="mirage-hedge", daemon=True)
+        attempt.thread.start()
+        return attempt
+
+    def _record_wasted(self, attempt: _Attempt) -> None:
+        # Callers hold _stats_lock.
+        if attempt.parsed is not None:
+            self.hedge_stats.wasted.add(attempt.parsed.get("usage"))
+
+    def _timed_send(self, data: bytes, latencies: LatencyHistogram) -> Dict[str, Any]:
+        started = time.monotonic()
+        parsed = self._send(data)
+        latencies.record(time.monotonic() - started)
+        return parsed
+
+    def _send(self, data: bytes) -> Dict[str, Any]:
         request = urllib.request.Request(
             "https://api.openai.com/v1/chat/completions",
             data=data,
@@ -54,7 +256,7 @@ class OpenAIClient:
             method="POST",
         )
         try:
-            with urllib.request.urlopen(request, timeout=60) as response:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
                 body = response.read().decode("utf-8")
         except urllib.error.HTTPError as error:
             detail = error.read().decode("utf-8", errors="ignore") if error.fp else ""
@@ -66,8 +268,6 @@ class OpenAIClient:
             parsed = json.loads(body)
         except json.JSONDecodeError as error:
             raise OpenAIError(f"Failed to decode OpenAI response: {body}") from error
-
-        try:
-            return parsed["choices"][0]
-        except (KeyError, IndexError, TypeError) as error:
-            raise OpenAIError(f"Unexpected OpenAI response: {parsed}") from error
+        if not isinstance(parsed, dict):
+            raise OpenAIError(f"Unexpected OpenAI response: {parsed}")
+        return parsed
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import unittest
+from pathlib import Path
+from typing import List
+
+from mirage_engine.analysis import Diagnostic, check_script, parse_script, required_features
+
+SAMPLE_SOURCE = """story "Sample"
+
+# Helpers return text; show emits it.
+
+inputs:
+  argument numbers as List<Int> with "Numbers to inspect"
+  file notes as Text with "Extra context"
+
+helper pick_champion returns Int:
+  needs pile (List<Int>) meaning "numbers"
+  needs context (Text)
+  prompt:
+<<<
+Pick the largest value. begin: is not a section header in here.
+>>>
+
+begin:
+  remember tag as Text with "Input numbers"
+  ask pick_champion for:
+    pile is argument numbers
+    context is file notes
+  keep answer as biggest
+  show memory biggest
+"""
+
+
+class ParseScriptTests(unittest.TestCase):
+    def test_recovers_declarations_and_statements(self) -> None:
+        script = parse_script(SAMPLE_SOURCE)
+
+        self.assertEqual(script.title, "Sample")
+        self.assertEqual(
+            [(decl.kind, decl.name, decl.type_name) for decl in script.inputs],
+            [("argument", "numbers", "List<Int>"), ("file", "notes", "Text")],
+        )
+        helper = script.helpers["pick_champion"]
+        self.assertEqual(helper.returns, "Int")
+        self.assertEqual(helper.needs, ["pile", "context"])
+        self.assertIn("Pick the largest value.", helper.prompt)
+
+        self.assertEqual(
+            [(statement.keyword, statement.target) for statement in script.statements],
+            [
+                ("remember", "tag"),
+                ("ask", "pick_champion"),
+                ("keep", "biggest"),
+                ("show", "biggest"),
+            ],
+        )
+        bindings = script.statements[1].bindings
+        self.assertEqual(
+            [(binding.parameter, binding.kind, binding.name) for binding in bindings],
+            [("pile", "argument", "numbers"), ("context", "file", "notes")],
+        )
+        self.assertEqual(bindings[0].line, 20)
+
+    def test_parses_for_each_statement(self) -> None:
+        source = SAMPLE_SOURCE.replace(
+            "  ask pick_champion for:\n    pile is argument numbers\n",
+            "  for each value in argument numbers ask pick_champion for:\n",
+        )
+        statement = parse_script(source).statements[1]
+
+        self.assertEqual((statement.keyword, statement.target), ("for", "pick_champion"))
+        collection = statement.collection
+        self.assertIsNotNone(collection)
+        self.assertEqual(
+            (collection.parameter, collection.kind, collection.name),  # type: ignore[union-attr]
+            ("value", "argument", "numbers"),
+        )
+        self.assertEqual([binding.parameter for binding in statement.bindings], ["context"])
+        helper = parse_script(source).helpers["pick_champion"]
+        self.assertEqual(statement.item_parameter(helper), "pile")
+        self.assertEqual(check_script(parse_script(source)), [])
+        self.assertIn("tool:map_helper", required_features(parse_script(source)))
+
+        duplicated = source.replace(
+            "  keep answer as biggest\n",
+            "  keep answer as biggest\n"
+            "  for each value in argument numbers ask pick_champion for:\n"
+            "    context is file notes\n",
+        )
+        errors = [
+            diagnostic.message
+            for diagnostic in check_script(parse_script(duplicated))
+            if diagnostic.severity == "error"
+        ]
+        self.assertEqual(len(errors), 1)
+        self.assertIn("already mapped over 'numbers'", errors[0])
+
+
+class RequiredFeaturesTests(unittest.TestCase):
+    def test_drops_unused_tools(self) -> None:
+        features = required_features(parse_script(SAMPLE_SOURCE))
+
+        self.assertIn("statement:ask", features)
+        self.assertNotIn("statement:raise", features)
+        self.assertIn("tool:get_input", features)
+        self.assertNotIn("tool:save_file", features)
+        self.assertIn("tool:raise_error", features)
+
+    def test_mentions_enable_tools(self) -> None:
+        source = (
+            'story "Writer"\n\nbegin:\n'
+            '  note with "Persist the draft using the save_file tool."\n'
+            '  raise error with "Stop."\n'
+        )
+        features = required_features(parse_script(source))
+
+        self.assertIn("tool:save_file", features)
+        self.assertIn("statement:raise", features)
+        self.assertNotIn("tool:get_input", features)
+        self.assertIn("tool:get_input", required_features(parse_script(source), has_inputs=True))
+
+
+class CheckScriptTests(unittest.TestCase):
+    def _messages(self, diagnostics: List[Diagnostic]) -> List[tuple[int, str, str]]:
+        return [(item.line, item.severity, item.message) for item in diagnostics]
+
+    def test_valid_script_has_no_diagnostics(self) -> None:
+        self.assertEqual(check_script(parse_script(SAMPLE_SOURCE)), [])
+
+    def test_reports_undefined_helper_and_memory_label(self) -> None:
+        source = SAMPLE_SOURCE.replace("ask pick_champion", "ask pick_winner").replace(
+            "pile is argument numbers", "pile is memory missing"
+        )
+        errors = [
+            (line, message)
+            for line, severity, message in self._messages(check_script(parse_script(source)))
+            if severity == "error"
+        ]
+        self.assertEqual(
+            errors,
+            [
+                (19, "Helper 'pick_winner' is not defined"),
+                (20, "Memory label 'missing' is not defined before use"),
+            ],
+        )
+
+    def test_cross_checks_supplied_inputs(self) -> None:
+        diagnostics = check_script(
+            parse_script(SAMPLE_SOURCE),
+            argument_inputs={"extra": "1"},
+            file_inputs={"notes": Path("/nonexistent/notes.txt")},
+        )
+        self.assertEqual(
+            self._messages(diagnostics),
+            [
+                (1, "warning", "Input 'extra' is supplied but not declared in 'inputs:'"),
+                (
+                    6,
+                    "error",
+                    "Missing value for argument 'numbers' (use --arg numbers=VALUE)",
+                ),
+                (
+                    7,
+                    "error",
+                    "File input 'notes' does not exist: /nonexistent/notes.txt",
+                ),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+from mirage_engine import cli
+from mirage_engine.llm_client import OpenAIError
+
+SOURCE = """story "Largest"
+
+inputs:
+  argument numbers as List<Int> with "Numbers to inspect"
+
+helper pick returns Int:
+  needs pile (List<Int>)
+  prompt:
+<<<
+Pick the largest value.
+>>>
+
+begin:
+  ask pick for:
+    pile is argument numbers
+  keep answer as biggest
+  show biggest
+"""
+
+
+class CliTests(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        self.script = self.root / "largest.mirage"
+        self.script.write_text(SOURCE, encoding="utf-8")
+
+    def _run(self, argv: List[str]) -> tuple[int | str | None, str, str]:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                code: int | str | None = cli.main(argv)
+            except SystemExit as error:
+                code = error.code
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def _main_args(self, *extra: str) -> List[str]:
+        return [str(self.script), "--env", str(self.root / "missing.env"), *extra]
+
+    def test_check_exit_code_reflects_errors(self) -> None:
+        code, stdout, _ = self._run(["check", str(self.script), "--arg", "numbers=[1, 2]"])
+        self.assertEqual((code, stdout), (0, ""))
+
+        code, stdout, _ = self._run(["check", str(self.script)])
+        self.assertEqual(code, 1)
+        self.assertIn("error: Missing value for argument 'numbers'", stdout)
+
+        code, _, _ = self._run(["check", str(self.script), "--static"])
+        self.assertEqual(code, 0)
+
+    def test_check_json_format(self) -> None:
+        code, stdout, _ = self._run(["check", str(self.script), "--format", "json"])
+
+        self.assertEqual(code, 1)
+        diagnostics = json.loads(stdout)
+        self.assertEqual(len(diagnostics), 1)
+        self.assertEqual(diagnostics[0]["severity"], "error")
+        self.assertEqual(diagnostics[0]["line"], 4)
+        self.assertIn("numbers", diagnostics[0]["message"])
+
+    def test_preflight_rejects_missing_argument_before_building_client(self) -> None:
+        with mock.patch.object(cli, "OpenAIClient") as client_class:
+            code, _, stderr = self._run(self._main_args())
+
+        self.assertEqual(code, 2)
+        self.assertIn("preflight check failed", stderr)
+        self.assertIn("--arg numbers=VALUE", stderr)
+        client_class.assert_not_called()
+
+    def test_skip_check_bypasses_preflight(self) -> None:
+        with mock.patch.object(
+            cli, "OpenAIClient", side_effect=OpenAIError("OPENAI_API_KEY is not set.")
+        ) as client_class:
+            code, _, stderr = self._run(self._main_args("--skip-check"))
+
+        self.assertEqual(code, 2)
+        self.assertNotIn("preflight", stderr)
+        self.assertIn("OPENAI_API_KEY is not set.", stderr)
+        client_class.assert_called_once()
+
+    def test_dry_run_skips_input_cross_check(self) -> None:
+        with mock.patch.object(cli, "OpenAIClient") as client_class:
+            code, stdout, _ = self._run(self._main_args("--dry-run"))
+
+        self.assertEqual(code, 0)
+        client_class.assert_not_called()
+        self.assertTrue(stdout.startswith(f"{self.script}:\n"))
+        self.assertIn("system prompt:", stdout)
+        self.assertIn("dropped tools: read_file, save_file\n", stdout)
+        self.assertRegex(stdout, r"saved per turn: \d+ chars \(~\d+ tokens\)")
+
+    def test_dry_run_still_checks_the_script(self) -> None:
+        self.script.write_text(SOURCE.replace("ask pick", "ask missing"), encoding="utf-8")
+
+        code, _, stderr = self._run(self._main_args("--dry-run"))
+
+        self.assertEqual(code, 2)
+        self.assertIn("Helper 'missing' is not defined", stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
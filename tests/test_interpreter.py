@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import json
 import tempfile
+import threading
 import unittest
 from pathlib import Path
 from typing import Any, Dict, List
 
-from mirage_engine.interpreter import MirageInterpreter, MirageRuntimeError
+from mirage_engine.interpreter import _TOOL_SCHEMAS, MirageInterpreter, MirageRuntimeError
 
 
 class FakeClient:
@@ -27,6 +28,71 @@ class FakeClient:
         return {"message": self._responses.pop(0)}
 
 
+def _tool_turn(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "role": "assistant",
+        "tool_calls": [
+            {
+                "id": f"call-{name}-{len(json.dumps(arguments))}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)},
+            }
+        ],
+    }
+
+
+def emit(text: str) -> Dict[str, Any]:
+    return _tool_turn("emit_output", {"text": text})
+
+
+class MapAwareClient(FakeClient):
+    """Answers helper-only completions (no tools) by shouting the item back."""
+
+    def __init__(self, responses: List[Dict[str, Any]]) -> None:
+        super().__init__(responses)
+        self._lock = threading.Lock()
+        self.helper_prompts: List[str] = []
+
+    def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        *,
+        tools: List[Dict[str, Any]] | None = None,
+        tool_choice: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
+        if tools is not None:
+            return super().complete(messages, tools=tools, tool_choice=tool_choice)
+        prompt = messages[-1]["content"]
+        with self._lock:
+            self.helper_prompts.append(prompt)
+        values = json.loads(prompt.split("Parameters (JSON):\n", 1)[1])
+        content = f"{values['tone']}:{values['text'].upper()}"
+        return {"message": {"role": "assistant", "content": content}}
+
+
+MAP_SOURCE = """story "Shout"
+
+inputs:
+  argument words as List<Text> with "Words to shout"
+
+helper shout returns Text:
+  needs tone (Text)
+  needs text (Text)
+  prompt:
+<<<
+Shout text in the given tone.
+>>>
+
+begin:
+  remember tone as Text with "loud"
+  for each word in argument words ask shout for:
+    text is item word
+    tone is memory tone
+  keep answer as shouted
+  show shouted
+"""
+
+
 class InterpreterTests(unittest.TestCase):
     def setUp(self) -> None:
         self.source_path = Path("/tmp/sample.mirage")
@@ -162,6 +228,332 @@ class InterpreterTests(unittest.TestCase):
             self.assertEqual(expected_path.read_text(encoding="utf-8"), "hello")
             self.assertEqual(Path(result["path"]), expected_path)
 
+    def test_prune_prompt_limits_tools_and_sections(self) -> None:
+        client = FakeClient([{"role": "assistant", "content": "done"}])
+        interpreter = MirageInterpreter(
+            source_path=self.source_path,
+            source_text=f"story \"Sample\"\n\nbegin:\n  {self.sample_source}\n",
+            client=client,  # type: ignore[arg-type]
+            prune_prompt=True,
+        )
+        interpreter.run()
+
+        tool_names = [schema["function"]["name"] for schema in client.calls[0]["tools"]]
+        self.assertEqual(tool_names, ["emit_output", "read_source", "raise_error"])
+        system_prompt = client.calls[0]["messages"][0]["content"]
+        self.assertIn("`remember label", system_prompt)
+        self.assertNotIn("`keep answer as label`", system_prompt)
+        self.assertNotIn("@@", system_prompt)
+        self.assertIn("If a tool call fails", system_prompt)
+        self.assertIn("This program takes no inputs.", client.calls[0]["messages"][1]["content"])
+
+    def test_unpruned_run_offers_map_helper_only_for_for_each(self) -> None:
+        plain = FakeClient([{"role": "assistant", "content": "done"}])
+        MirageInterpreter(
+            source_path=self.source_path,
+            source_text=self.sample_source,
+            client=plain,  # type: ignore[arg-type]
+        ).run()
+        mapped = MapAwareClient([{"role": "assistant", "content": "done"}])
+        MirageInterpreter(
+            source_path=self.source_path,
+            source_text=MAP_SOURCE,
+            client=mapped,  # type: ignore[arg-type]
+        ).run()
+
+        plain_tools = [schema["function"]["name"] for schema in plain.calls[0]["tools"]]
+        mapped_tools = [schema["function"]["name"] for schema in mapped.calls[0]["tools"]]
+        self.assertNotIn("map_helper", plain_tools)
+        self.assertEqual(len(plain_tools), 7)
+        self.assertNotIn("`for each", plain.calls[0]["messages"][0]["content"])
+        self.assertIn("map_helper", mapped_tools)
+        self.assertIn("`for each", mapped.calls[0]["messages"][0]["content"])
+
+    def test_array_parameters_declare_their_items(self) -> None:
+        # The Chat Completions API rejects array schemas without an `items` subschema.
+        for schema in _TOOL_SCHEMAS:
+            properties = schema["function"]["parameters"]["properties"]
+            for name, spec in properties.items():
+                if spec.get("type") == "array":
+                    self.assertIn("items", spec, f"{schema['function']['name']}.{name}")
+
+    def test_map_helper_runs_each_item_in_order(self) -> None:
+        client = MapAwareClient(
+            [
+                {
+                    "role": "assistant",
+                    "tool_calls": [
+                        {
+                            "id": "call-map",
+                            "type": "function",
+                            "function": {
+                                "name": "map_helper",
+                                "arguments": json.dumps(
+                                    {
+                                        "helper": "shout",
+                                        "source": "words",
+                                        "bindings": {"tone": "loud"},
+                                    }
+                                ),
+                            },
+                        }
+                    ],
+                },
+                {"role": "assistant", "content": "done"},
+            ]
+        )
+        interpreter = MirageInterpreter(
+            source_path=self.source_path,
+            source_text=MAP_SOURCE,
+            client=client,  # type: ignore[arg-type]
+            argument_inputs={"words": '["a", "b", "c", "d", "e"]'},
+            map_workers=3,
+        )
+        interpreter.run()
+
+        payload = json.loads(client.calls[1]["messages"][-1]["content"])
+        self.assertEqual(payload["results"], ["loud:A", "loud:B", "loud:C", "loud:D", "loud:E"])
+        self.assertEqual(len(client.helper_prompts), 5)
+        self.assertIn("Shout text in the given tone.", client.helper_prompts[0])
+        # Map workers are tallied apart from the two conversation turns.
+        stats = interpreter.tier_stats["strong"]
+        self.assertEqual(stats.turns, 2)
+        self.assertEqual(stats.map_calls, 5)
+
+    def test_map_helper_requires_memory_bindings(self) -> None:
+        interpreter = MirageInterpreter(
+            source_path=self.source_path,
+            source_text=MAP_SOURCE,
+            client=MapAwareClient([]),  # type: ignore[arg-type]
+            argument_inputs={"words": '["a"]'},
+        )
+
+        with self.assertRaisesRegex(MirageRuntimeError, "bindings.tone"):
+            interpreter._tool_map_helper({"helper": "shout", "source": "words"})
+
+    def test_map_helper_picks_statement_by_source(self) -> None:
+        source = MAP_SOURCE.replace(
+            "  keep answer as shouted\n",
+            "  keep answer as shouted\n"
+            "  for each word in argument names ask shout for:\n"
+            "    text is item word\n"
+            "    tone is memory tone\n"
+            "  keep answer as shouted_names\n",
+        ).replace(
+            '  argument words as List<Text> with "Words to shout"\n',
+            '  argument words as List<Text> with "Words to shout"\n'
+            '  argument names as List<Text> with "Names to shout"\n',
+        )
+        interpreter = MirageInterpreter(
+            source_path=self.source_path,
+            source_text=source,
+            client=MapAwareClient([]),  # type: ignore[arg-type]
+            argument_inputs={"words": '["a"]', "names": '["ann", "bo"]'},
+        )
+
+        result = interpreter._tool_map_helper(
+            {"helper": "shout", "source": "names", "bindings": {"tone": "soft"}}
+        )
+        self.assertEqual(result["results"], ["soft:ANN", "soft:BO"])
+        with self.assertRaisesRegex(MirageRuntimeError, "over 'missing'"):
+            interpreter._tool_map_helper({"helper": "shout", "source": "missing"})
+
+    def test_routes_mechanical_turns_to_fast_client(self) -> None:
+        source = (
+            'story "Routing"\n\nhelper judge returns Text:\n  prompt:\n<<<\nJudge.\n>>>\n\n'
+            "begin:\n"
+            '  remember note as Text with "hello"\n'
+            "  ask judge for:\n"
+            "  keep answer as verdict\n"
+            "  show verdict\n"
+            "  show note\n"
+        )
+        strong = FakeClient([emit("verdict")])
+        fast = FakeClient([emit("hello"), {"role": "assistant", "content": "done"}])
+        interpreter = MirageInterpreter(
+            source_path=self.source_path,
+            source_text=source,
+            client=strong,  # type: ignore[arg-type]
+            fast_client=fast,  # type: ignore[arg-type]
+        )
+        result = interpreter.run()
+
+        self.assertEqual(result.outputs, ["verdict", "hello"])
+        self.assertEqual(len(strong.calls), 1)
+        self.assertEqual(len(fast.calls), 2)
+        self.assertEqual(result.tier_stats["strong"].turns, 1)
+        self.assertEqual(result.tier_stats["fast"].turns, 2)
+        self.assertEqual(result.tier_stats["strong"].map_calls, 0)
+
+    def test_router_keeps_strong_tier_until_every_pending_helper_is_shown(self) -> None:
+        source = (
+            'story "Two asks"\n\n'
+            "inputs:\n"
+            '  argument numbers as List<Int> with "Numbers"\n\n'
+            "helper find returns Text:\n  needs quest (Text)\n  prompt:\n<<<\nFind.\n>>>\n\n"
+            "helper verify returns Text:\n  needs quest (Text)\n  prompt:\n<<<\nVerify.\n>>>\n\n"
+            "begin:\n"
+            '  remember quest as Text with "numbers: {numbers}"\n'
+            "  ask find for:\n"
+            "    quest is memory quest\n"
+            "  keep answer as pair\n"
+            "  ask verify for:\n"
+            "    quest is memory quest\n"
+            "  keep answer as proof\n"
+            "  show pair\n"
+            "  show proof\n"
+        )
+        strong = FakeClient([emit("pair"), emit("proof")])
+        fast = FakeClient(
+            [
+                _tool_turn("get_input", {"name": "numbers", "kind": "argument"}),
+                {"role": "assistant", "content": "done"},
+            ]
+        )
+        interpreter = MirageInterpreter(
+            source_path=self.source_path,
+            source_text=source,
+            client=strong,  # type: ignore[arg-type]
+            fast_client=fast,  # type: ignore[arg-type]
+            argument_inputs={"numbers": "[1, 2]"},
+        )
+        result = interpreter.run()
+
+        self.assertEqual(result.outputs, ["pair", "proof"])
+        # The fetch turn and the closing turn are mechanical; the turn after
+        # `show pair` still has to produce verify's proof.
+        self.assertEqual(len(fast.calls), 2)
+        self.assertEqual(len(strong.calls), 2)
+        self.assertEqual(strong.calls[1]["messages"][-1]["content"], '{"status": "ok"}')
+
+
+    def test_router_keeps_ask_after_for_each_on_strong_tier(self) -> None:
+        source = (
+            'story "Shout and judge"\n\n'
+            "inputs:\n"
+            '  argument words as List<Text> with "Words to shout"\n'
+            '  argument tone as Text with "Tone"\n\n'
+            "helper shout returns Text:\n  needs tone (Text)\n  needs text (Text)\n"
+            "  prompt:\n<<<\nShout.\n>>>\n\n"
+            "helper judge returns Text:\n  prompt:\n<<<\nJudge.\n>>>\n\n"
+            "begin:\n"
+            "  for each word in argument words ask shout for:\n"
+            "    text is item word\n"
+            "    tone is argument tone\n"
+            "  keep answer as shouted\n"
+            "  ask judge for:\n"
+            "  keep answer as verdict\n"
+            "  show shouted\n"
+            "  show verdict\n"
+        )
+        strong = MapAwareClient(
+            [
+                _tool_turn("map_helper", {"helper": "shout", "source": "words"}),
+                emit("LOUD:A"),
+                emit("fine"),
+            ]
+        )
+        fast = FakeClient([{"role": "assistant", "content": "done"}])
+        interpreter = MirageInterpreter(
+            source_path=self.source_path,
+            source_text=source,
+            client=strong,  # type: ignore[arg-type]
+            fast_client=fast,  # type: ignore[arg-type]
+            argument_inputs={"words": '["a"]', "tone": "loud"},
+        )
+        result = interpreter.run()
+
+        self.assertEqual(result.outputs, ["LOUD:A", "fine"])
+        self.assertEqual(len(fast.calls), 1)
+        # The turn after map_helper still has judge to run.
+        self.assertEqual(len(strong.calls), 3)
+        self.assertIn('"results": ["loud:A"]', strong.calls[1]["messages"][-1]["content"])
+
+
+    def test_router_falls_back_to_strong_when_outputs_outrun_shows(self) -> None:
+        source = (
+            'story "Split"\n\nhelper judge returns Text:\n  prompt:\n<<<\nJudge.\n>>>\n\n'
+            "begin:\n"
+            '  remember note as Text with "hello world"\n'
+            "  show note\n"
+            "  ask judge for:\n"
+            "  keep answer as verdict\n"
+            "  show verdict\n"
+        )
+        split_show = emit("hello")
+        split_show["tool_calls"].append(
+            {
+                "id": "call-second-line",
+                "type": "function",
+                "function": {"name": "emit_output", "arguments": json.dumps({"text": "world"})},
+            }
+        )
+        strong = FakeClient([emit("verdict"), {"role": "assistant", "content": "done"}])
+        fast = FakeClient([split_show])
+        result = MirageInterpreter(
+            source_path=self.source_path,
+            source_text=source,
+            client=strong,  # type: ignore[arg-type]
+            fast_client=fast,  # type: ignore[arg-type]
+        ).run()
+
+        # Two lines for one show would otherwise mark `verdict` as shown before judge runs.
+        self.assertEqual(result.outputs, ["hello", "world", "verdict"])
+        self.assertEqual(len(fast.calls), 1)
+        self.assertEqual(len(strong.calls), 2)
+
+    def test_router_stays_strong_when_helpers_stream_output(self) -> None:
+        source = (
+            'story "Stream"\n\nhelper narrate returns Text:\n  prompt:\n<<<\n'
+            "Call emit_output for each step.\n>>>\n\n"
+            "begin:\n"
+            "  ask narrate for:\n"
+            "  keep answer as story\n"
+            "  show story\n"
+        )
+        strong = FakeClient([emit("step"), emit("story"), {"role": "assistant", "content": "done"}])
+        fast = FakeClient([])
+        MirageInterpreter(
+            source_path=self.source_path,
+            source_text=source,
+            client=strong,  # type: ignore[arg-type]
+            fast_client=fast,  # type: ignore[arg-type]
+        ).run()
+
+        self.assertEqual(len(strong.calls), 3)
+        self.assertEqual(fast.calls, [])
+
+    def test_router_does_not_wait_on_missing_inputs(self) -> None:
+        source = (
+            'story "Missing"\n\n'
+            "inputs:\n"
+            '  argument numbers as List<Int> with "Numbers"\n\n'
+            "helper find returns Text:\n  needs quest (Text)\n  prompt:\n<<<\nFind.\n>>>\n\n"
+            "begin:\n"
+            '  remember quest as Text with "numbers: {numbers}"\n'
+            "  ask find for:\n"
+            "    quest is memory quest\n"
+            "  keep answer as pair\n"
+            "  show pair\n"
+        )
+        strong = FakeClient([emit("no numbers")])
+        fast = FakeClient(
+            [
+                _tool_turn("get_input", {"name": "numbers", "kind": "argument"}),
+                {"role": "assistant", "content": "done"},
+            ]
+        )
+        result = MirageInterpreter(
+            source_path=self.source_path,
+            source_text=source,
+            client=strong,  # type: ignore[arg-type]
+            fast_client=fast,  # type: ignore[arg-type]
+        ).run()
+
+        self.assertEqual(result.outputs, ["no numbers"])
+        self.assertEqual(len(strong.calls), 1)
+        self.assertFalse(json.loads(strong.calls[0]["messages"][-1]["content"])["available"])
+
 
 if __name__ == "__main__":
     unittest.main()
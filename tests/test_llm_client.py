@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+from typing import Any, Dict, List
+
+from mirage_engine.llm_client import LatencyHistogram, OpenAIClient, OpenAIError
+
+
+class ScriptedClient(OpenAIClient):
+    """Client whose transport replays (delay, reply) pairs instead of calling the API."""
+
+    def __init__(self, replies: List[tuple[float, Any]], **kwargs: Any) -> None:
+        super().__init__(api_key="test-key", **kwargs)
+        self._replies = list(replies)
+        self._lock = threading.Lock()
+
+    def _send(self, data: bytes) -> Dict[str, Any]:
+        with self._lock:
+            delay, reply = self._replies.pop(0)
+        time.sleep(delay)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+def _reply(text: str, tokens: int = 10) -> Dict[str, Any]:
+    return {
+        "choices": [{"message": {"role": "assistant", "content": text}}],
+        "usage": {"prompt_tokens": tokens, "completion_tokens": 1},
+    }
+
+
+class LatencyHistogramTests(unittest.TestCase):
+    def test_percentile_uses_nearest_rank(self) -> None:
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(95))
+        for value in range(1, 11):
+            histogram.record(float(value))
+        self.assertEqual(histogram.percentile(50), 5.0)
+        self.assertEqual(histogram.percentile(95), 10.0)
+
+
+class HedgingTests(unittest.TestCase):
+    def test_without_hedging_records_usage(self) -> None:
+        client = ScriptedClient([(0, _reply("only"))])
+        choice = client.complete([{"role": "user", "content": "hi"}])
+        self.assertEqual(choice["message"]["content"], "only")
+        self.assertEqual(client.usage.prompt_tokens, 10)
+        self.assertEqual(client.hedge_stats.hedges_fired, 0)
+
+    def test_fast_primary_does_not_hedge(self) -> None:
+        client = ScriptedClient([(0, _reply("primary"))], hedge_percentile=95)
+        choice = client.complete([{"role": "user", "content": "hi"}])
+        self.assertEqual(choice["message"]["content"], "primary")
+        self.assertEqual(client.hedge_stats.requests, 1)
+        self.assertEqual(client.hedge_stats.hedges_fired, 0)
+
+    def test_slow_primary_is_hedged_and_backup_wins(self) -> None:
+        client = ScriptedClient(
+            [(0.3, _reply("primary", tokens=7)), (0, _reply("backup"))],
+            hedge_percentile=95,
+            hedge_initial_delay=0.05,
+        )
+        choice = client.complete([{"role": "user", "content": "hi"}])
+        self.assertEqual(choice["message"]["content"], "backup")
+        self.assertEqual(client.hedge_stats.hedges_fired, 1)
+        self.assertEqual(client.hedge_stats.hedges_won, 1)
+        self.assertEqual(client.usage.prompt_tokens, 10)
+
+        self.assertEqual(client.drain_hedges(timeout=5), 0)
+        self.assertEqual(client.hedge_stats.wasted.prompt_tokens, 7)
+
+    def test_drain_reports_requests_still_in_flight(self) -> None:
+        release = threading.Event()
+        client = ScriptedClient(
+            [(0, _reply("reply")), (0, _reply("reply"))],
+            hedge_percentile=95,
+            hedge_initial_delay=0.01,
+        )
+        original_send = client._send
+        calls: List[int] = []
+
+        def gated_send(data: bytes) -> Dict[str, Any]:
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(5)
+            return original_send(data)
+
+        client._send = gated_send  # type: ignore[method-assign]
+        choice = client.complete([{"role": "user", "content": "hi"}])
+
+        self.assertEqual(choice["message"]["content"], "reply")
+        self.assertEqual(client.hedge_stats.hedges_won, 1)
+        hedge_threads = [t for t in threading.enumerate() if t.name == "mirage-hedge"]
+        self.assertTrue(hedge_threads)
+        self.assertTrue(all(thread.daemon for thread in hedge_threads))
+        self.assertEqual(client.drain_hedges(timeout=0), 1)
+        self.assertEqual(client.hedge_stats.wasted.prompt_tokens, 0)
+        release.set()
+        self.assertEqual(client.drain_hedges(timeout=5), 0)
+        self.assertEqual(client.hedge_stats.wasted.prompt_tokens, 10)
+
+    def test_failed_backup_falls_back_to_primary(self) -> None:
+        client = ScriptedClient(
+            [(0.1, _reply("primary")), (0, OpenAIError("boom"))],
+            hedge_percentile=95,
+            hedge_initial_delay=0.02,
+        )
+        choice = client.complete([{"role": "user", "content": "hi"}])
+        self.assertEqual(choice["message"]["content"], "primary")
+        self.assertEqual(client.hedge_stats.hedges_won, 0)
+
+    def test_delay_adapts_to_observed_latency(self) -> None:
+        client = ScriptedClient([], hedge_percentile=50, hedge_min_samples=3)
+        self.assertEqual(client.hedge_delay(), client.hedge_initial_delay)
+        for value in (1.0, 2.0, 3.0):
+            client.latencies.record(value)
+        self.assertEqual(client.hedge_delay(), 2.0)
+
+    def test_tool_less_requests_keep_their_own_latencies(self) -> None:
+        client = ScriptedClient(
+            [(0, _reply("helper")), (0, _reply("turn"))], hedge_percentile=50, hedge_min_samples=1
+        )
+        client.latencies.record(2.0)
+        client.complete([{"role": "user", "content": "item"}])
+        self.assertEqual(len(client.toolless_latencies), 1)
+        self.assertEqual(len(client.latencies), 1)
+        self.assertEqual(client.hedge_delay(), 2.0)
+
+        tools = [{"type": "function", "function": {"name": "noop", "parameters": {}}}]
+        client.complete([{"role": "user", "content": "turn"}], tools=tools)
+        self.assertEqual(len(client.latencies), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()